@@ -12,7 +12,15 @@ setup(
         "pywin32>=303",
         "pillow>=9.0.0",
         "psutil>=5.9.0",
+        "aiofiles>=23.1.0",
     ],
+    extras_require={
+        "speedups": [
+            "pybase64>=1.0.0",
+            "PyTurboJPEG>=1.7.0",
+            "numpy>=1.21.0",
+        ],
+    },
     entry_points={
         "console_scripts": [
             "tpc-mcp=tpc_server:main",
@@ -23,11 +31,11 @@ setup(
         "Intended Audience :: System Administrators",
         "License :: OSI Approved :: MIT License",
         "Programming Language :: Python :: 3",
-        "Programming Language :: Python :: 3.7",
-        "Programming Language :: Python :: 3.8",
-        "Programming Language :: Python :: 3.9",
         "Programming Language :: Python :: 3.10",
+        "Programming Language :: Python :: 3.11",
+        "Programming Language :: Python :: 3.12",
+        "Programming Language :: Python :: 3.13",
         "Topic :: System :: Systems Administration",
     ],
-    python_requires=">=3.7",
+    python_requires=">=3.10",
 )
@@ -5,131 +5,651 @@ Remote PC control solution using Model Context Protocol
 """
 
 import os
+import asyncio
 import base64
+import collections
+import ctypes
+import heapq
 import io
+import locale
+import mmap
+import multiprocessing
+import re
+import shlex
+import signal
+import stat
 import sys
+import sysconfig
 import psutil
 import time
+import types
+import zlib
 import subprocess
+import tempfile
 import threading
 import platform
-from datetime import datetime
-from typing import List, Dict, Any, Optional
+import queue
+import uuid
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import contextmanager
+from ctypes import wintypes
+from multiprocessing import shared_memory
+from typing import List, Dict, Any, Mapping, Optional
 from pathlib import Path
 
+import aiofiles
+import aiofiles.os
 import win32gui
 import win32ui
 import win32con
 import win32api
-from PIL import Image, ImageGrab
+from PIL import Image
+
+try:
+    import pybase64
+except ImportError:  # optional SIMD base64 codec
+    pybase64 = None
+
+try:
+    import numpy as np
+    from turbojpeg import TurboJPEG, TJPF_BGRX, TJPF_RGB
+    _turbojpeg = TurboJPEG()
+except (ImportError, OSError, RuntimeError):  # optional libjpeg-turbo encoder
+    _turbojpeg = None
 
 from mcp.server.fastmcp import FastMCP
 
 # Initialize FastMCP server
 mcp = FastMCP("tpc-server")
 
+# Worker pool for blocking tool bodies, large enough that slow tools
+# (PowerShell, screenshots) don't starve quick ones
+_tool_executor = ThreadPoolExecutor(max_workers=32, thread_name_prefix="tpc-tool")
+
+async def _to_thread(func, *args):
+    """Run a blocking tool body on the shared worker pool"""
+    return await asyncio.get_running_loop().run_in_executor(_tool_executor, func, *args)
+
 # ----- Screen Capture Tools ----- #
 
-# Global variables for auto-refresh
-_refresh_thread = None
-_refresh_active = False
-_refresh_interval = 0
-_last_screenshot = None
-_last_screenshot_time = 0
+_gdi32 = ctypes.windll.gdi32
+_gdi32.CreateDIBSection.argtypes = [
+    wintypes.HDC, ctypes.c_void_p, wintypes.UINT,
+    ctypes.POINTER(ctypes.c_void_p), wintypes.HANDLE, wintypes.DWORD,
+]
+_gdi32.CreateDIBSection.restype = wintypes.HBITMAP
+_user32 = ctypes.windll.user32
+_user32.PrintWindow.argtypes = [wintypes.HWND, wintypes.HDC, wintypes.UINT]
+_user32.PrintWindow.restype = wintypes.BOOL
 
-@mcp.tool()
-async def capture_screen(quality: int = 80) -> str:
-    """Capture the current screen and return as base64 encoded image.
+# PrintWindow flag that includes DirectComposition/GPU-rendered content
+_PW_RENDERFULLCONTENT = 0x00000002
+
+def _enable_dpi_awareness():
+    """Make the process per-monitor DPI aware.
     
-    Args:
-        quality: Image quality (1-100), lower values mean smaller file size but lower quality
+    Otherwise Windows reports scaled (logical) sizes on 125-150% displays,
+    so screen metrics, window rects and captures would not cover the
+    desktop at native resolution. Falls back to older APIs on Windows
+    versions without DPI awareness contexts.
+    """
+    try:
+        # DPI_AWARENESS_CONTEXT_PER_MONITOR_AWARE_V2
+        if _user32.SetProcessDpiAwarenessContext(ctypes.c_void_p(-4)):
+            return
+    except AttributeError:
+        pass
+    try:
+        ctypes.windll.shcore.SetProcessDpiAwareness(2)  # PROCESS_PER_MONITOR_DPI_AWARE
+    except (AttributeError, OSError):
+        _user32.SetProcessDPIAware()
+
+_enable_dpi_awareness()
+
+class _BITMAPINFOHEADER(ctypes.Structure):
+    _fields_ = [
+        ("biSize", wintypes.DWORD),
+        ("biWidth", wintypes.LONG),
+        ("biHeight", wintypes.LONG),
+        ("biPlanes", wintypes.WORD),
+        ("biBitCount", wintypes.WORD),
+        ("biCompression", wintypes.DWORD),
+        ("biSizeImage", wintypes.DWORD),
+        ("biXPelsPerMeter", wintypes.LONG),
+        ("biYPelsPerMeter", wintypes.LONG),
+        ("biClrUsed", wintypes.DWORD),
+        ("biClrImportant", wintypes.DWORD),
+    ]
+
+def _create_dib_section(hdc, width, height):
+    """Create a 32-bit top-down DIB section.
     
-    Returns a base64-encoded JPEG image of the current screen.
+    Unlike a compatible bitmap its pixels are always BGRX rows of width * 4
+    bytes, whatever the display's bit depth (RDP sessions often run at 16
+    or 24 bpp). Returns (hbitmap, address of the pixel data).
     """
+    header = _BITMAPINFOHEADER(
+        biSize=ctypes.sizeof(_BITMAPINFOHEADER),
+        biWidth=width,
+        biHeight=-height,  # negative height means rows run top to bottom
+        biPlanes=1,
+        biBitCount=32,
+        biCompression=0,  # BI_RGB
+    )
+    bits = ctypes.c_void_p()
+    hbitmap = _gdi32.CreateDIBSection(hdc, ctypes.byref(header), 0, ctypes.byref(bits), None, 0)
+    if not hbitmap:
+        raise ctypes.WinError()
+    return hbitmap, bits.value
+
+class _ScreenGrabber:
+    """Persistent BitBlt capture context for the virtual screen.
+    
+    The screen DC, memory DC and DIB section are created once and reused by
+    every capture; they are only reallocated when the virtual screen
+    geometry changes. Captured pixels are read straight from the DIB.
+    """
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._geometry = None
+        self._hdc_screen = None
+        self._mem_dc = None
+        self._bitmap = None
+        self._old_bitmap = None
+        self._view = None
+    
+    def _release(self):
+        if self._view is not None:
+            self._view.release()
+        if self._mem_dc is not None:
+            win32gui.SelectObject(self._mem_dc, self._old_bitmap)
+            win32gui.DeleteDC(self._mem_dc)
+        if self._bitmap is not None:
+            win32gui.DeleteObject(self._bitmap)
+        if self._hdc_screen is not None:
+            win32gui.ReleaseDC(0, self._hdc_screen)
+        self._geometry = None
+        self._hdc_screen = self._mem_dc = self._bitmap = self._old_bitmap = None
+        self._view = None
+    
+    def _ensure(self):
+        geometry = (
+            win32api.GetSystemMetrics(win32con.SM_XVIRTUALSCREEN),
+            win32api.GetSystemMetrics(win32con.SM_YVIRTUALSCREEN),
+            win32api.GetSystemMetrics(win32con.SM_CXVIRTUALSCREEN),
+            win32api.GetSystemMetrics(win32con.SM_CYVIRTUALSCREEN),
+        )
+        if geometry == self._geometry:
+            return
+        
+        # Resolution changed (or first use) - rebuild the GDI objects
+        self._release()
+        _, _, width, height = geometry
+        self._hdc_screen = win32gui.GetDC(0)
+        self._mem_dc = win32gui.CreateCompatibleDC(self._hdc_screen)
+        self._bitmap, bits = _create_dib_section(self._mem_dc, width, height)
+        self._old_bitmap = win32gui.SelectObject(self._mem_dc, self._bitmap)
+        self._view = memoryview((ctypes.c_char * (width * height * 4)).from_address(bits)).cast('B')
+        self._geometry = geometry
+    
+    @contextmanager
+    def frame(self, bbox=None):
+        """Capture the screen, or the bbox region of it.
+        
+        Args:
+            bbox: Optional (left, top, right, bottom) region in screen
+                  coordinates; it is clipped to the virtual screen
+        
+        Yields a _Frame over the grabber's DIB pixels, so it is only valid
+        inside the ``with`` block; the lock is held until the block exits.
+        """
+        with self.lock:
+            self._ensure()
+            left, top, width, height = self._geometry
+            if bbox is None:
+                x, y, w, h = left, top, width, height
+            else:
+                x0, y0 = max(bbox[0], left), max(bbox[1], top)
+                x1, y1 = min(bbox[2], left + width), min(bbox[3], top + height)
+                if x1 <= x0 or y1 <= y0:
+                    raise ValueError(f"Capture region {tuple(bbox)} is outside the screen")
+                x, y, w, h = x0, y0, x1 - x0, y1 - y0
+            
+            # The region lands in the top-left corner of the DIB; rows keep
+            # the full DIB stride. CAPTUREBLT includes layered windows
+            # (tooltips, menus, overlays) in the copy.
+            stride = width * 4
+            win32gui.BitBlt(self._mem_dc, 0, 0, w, h, self._hdc_screen, x, y,
+                            win32con.SRCCOPY | win32con.CAPTUREBLT)
+            _gdi32.GdiFlush()
+            yield _Frame(self._view[:stride * h], w, h, stride)
+
+class _Frame:
+    """Raw BGRX pixels captured by _ScreenGrabber.frame()"""
+    
+    __slots__ = ("raw", "width", "height", "stride")
+    
+    def __init__(self, raw, width, height, stride):
+        self.raw = raw
+        self.width = width
+        self.height = height
+        self.stride = stride
+    
+    def image(self):
+        """Convert the frame to an RGB PIL image (copies the pixels)"""
+        return Image.frombuffer('RGB', (self.width, self.height), self.raw, 'raw', 'BGRX', self.stride, 1)
+
+_screen_grabber = _ScreenGrabber()
+
+def _b64encode(data) -> str:
+    """Base64-encode a bytes-like object straight to a str."""
+    if pybase64 is not None:
+        return pybase64.b64encode_as_string(data)
+    return base64.b64encode(data).decode('ascii')
+
+def _encode_image(image, buffer, image_format="jpeg", quality=80):
+    """Encode a PIL image into buffer, favouring encode speed over size.
+    
+    Returns the MIME subtype of the written data.
+    """
+    if image_format == "png":
+        # zlib level 1 is several times faster than the default level 6
+        image.save(buffer, format="PNG", compress_level=1)
+        return "png"
+    if _turbojpeg is not None:
+        # libjpeg-turbo's SIMD encoder is several times faster than Pillow's
+        pixels = np.asarray(image if image.mode == "RGB" else image.convert("RGB"))
+        buffer.write(_turbojpeg.encode(pixels, quality=quality, pixel_format=TJPF_RGB))
+    else:
+        image.save(buffer, format="JPEG", quality=quality)
+    return "jpeg"
+
+def _encode_frame(frame, buffer, image_format="jpeg", quality=80):
+    """Encode a captured frame into buffer.
+    
+    With libjpeg-turbo available, JPEG is encoded straight from the BGRX
+    rows without building a PIL image first. Returns the MIME subtype.
+    """
+    if _turbojpeg is not None and image_format != "png":
+        rows = np.frombuffer(frame.raw, dtype=np.uint8).reshape(frame.height, frame.stride // 4, 4)
+        pixels = rows[:, :frame.width]
+        buffer.write(_turbojpeg.encode(pixels, quality=quality, pixel_format=TJPF_BGRX))
+        return "jpeg"
+    return _encode_image(frame.image(), buffer, image_format, quality)
+
+# CRC32 of the last skip_unchanged capture per (region, format, quality),
+# so alternating captures of different regions each compare with their own
+# previous frame. Only accessed while holding _screen_grabber.lock.
+_last_capture_crcs: Dict[tuple, int] = {}
+_LAST_CAPTURE_MAX = 32
+
+def _capture_screen_impl(quality: int, image_format: str, bbox: Optional[List[int]], skip_unchanged: bool) -> str:
     try:
-        # Validate quality
+        # Validate parameters
         quality = max(1, min(100, quality))
+        image_format = image_format.lower()
+        if image_format not in ("jpeg", "jpg", "png"):
+            return f"Unsupported image format '{image_format}'. Use 'jpeg' or 'png'."
+        if bbox is not None and len(bbox) != 4:
+            return "bbox must be [left, top, right, bottom]."
         
-        # Capture entire screen using PIL
-        screenshot = ImageGrab.grab()
-        
-        # Convert to base64 with specified quality
+        # Capture the screen (or region) into the reusable buffer and encode in place
         buffer = io.BytesIO()
-        screenshot.save(buffer, format="JPEG", quality=quality)
-        img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        with _screen_grabber.frame(bbox) as frame:
+            if skip_unchanged:
+                # A CRC over the raw pixels is far cheaper than encoding, so an
+                # unchanged screen can be reported without producing an image
+                settings = (tuple(bbox) if bbox else None, image_format, quality)
+                crc = zlib.crc32(frame.raw)
+                unchanged = _last_capture_crcs.get(settings) == crc
+                if settings not in _last_capture_crcs and len(_last_capture_crcs) >= _LAST_CAPTURE_MAX:
+                    _last_capture_crcs.clear()
+                _last_capture_crcs[settings] = crc
+                if unchanged:
+                    return "![Screenshot](unchanged)"
+            mime = _encode_frame(frame, buffer, image_format, quality)
+        img_str = _b64encode(buffer.getbuffer())
         
         # Return as Markdown image format with base64 data
-        return f"![Screenshot](data:image/jpeg;base64,{img_str})"
+        return f"![Screenshot](data:image/{mime};base64,{img_str})"
     except Exception as e:
         return f"Error capturing screen: {str(e)}"
 
 @mcp.tool()
-async def capture_window(window_title: str = "", quality: int = 80) -> str:
-    """Capture a specific window or the active window and return as base64 encoded image.
+async def capture_screen(
+    quality: int = 80,
+    image_format: str = "jpeg",
+    bbox: Optional[List[int]] = None,
+    skip_unchanged: bool = False
+) -> str:
+    """Capture the current screen and return as base64 encoded image.
     
     Args:
-        window_title: Title of window to capture (leave empty for active window)
         quality: Image quality (1-100), lower values mean smaller file size but lower quality
+        image_format: 'jpeg' (default, smallest payload) or 'png' (lossless, fast compression)
+        bbox: Optional region to capture as [left, top, right, bottom] in screen coordinates
+        skip_unchanged: Return '![Screenshot](unchanged)' instead of an image if the
+                        screen is identical to the previous skip_unchanged capture
+                        with the same settings
     
-    Returns a base64-encoded JPEG image of the specified window.
+    Returns a base64-encoded JPEG or PNG image of the current screen.
     """
+    return await _to_thread(_capture_screen_impl, quality, image_format, bbox, skip_unchanged)
+
+# Process pool for encoding one frame at several qualities in parallel;
+# created on first use since spawned workers re-import this module
+_encode_pool = None
+_encode_pool_lock = threading.Lock()
+
+def _get_encode_pool():
+    global _encode_pool
+    with _encode_pool_lock:
+        if _encode_pool is None:
+            _encode_pool = ProcessPoolExecutor(
+                max_workers=min(8, os.cpu_count() or 1),
+                mp_context=multiprocessing.get_context("spawn")
+            )
+        return _encode_pool
+
+def _encode_shared_frame(shm_name, width, height, stride, quality):
+    """Encode a BGRX frame held in shared memory as JPEG (runs in a worker process)"""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    raw = shm.buf[:stride * height]
+    try:
+        buffer = io.BytesIO()
+        _encode_frame(_Frame(raw, width, height, stride), buffer, "jpeg", quality)
+        return buffer.getvalue()
+    finally:
+        raw.release()
+        shm.close()
+
+def _capture_screen_multi_impl(qualities: List[int]) -> str:
+    try:
+        # Validate qualities, keeping the requested order
+        qualities = list(dict.fromkeys(max(1, min(100, q)) for q in qualities))
+        if not qualities:
+            return "Provide at least one quality value."
+        
+        # Grab the screen once and share the raw pixels with the workers
+        with _screen_grabber.frame() as frame:
+            shm = shared_memory.SharedMemory(create=True, size=len(frame.raw))
+            shm.buf[:len(frame.raw)] = frame.raw
+            width, height, stride = frame.width, frame.height, frame.stride
+        try:
+            pool = _get_encode_pool()
+            futures = [
+                pool.submit(_encode_shared_frame, shm.name, width, height, stride, quality)
+                for quality in qualities
+            ]
+            images = [future.result() for future in futures]
+        finally:
+            shm.close()
+            shm.unlink()
+        
+        # Return one Markdown image per quality, with its encoded size
+        parts = []
+        for quality, data in zip(qualities, images):
+            parts.append(
+                f"Quality {quality} ({len(data) / 1024:.1f} KB):\n\n"
+                f"![Screenshot q{quality}](data:image/jpeg;base64,{_b64encode(data)})"
+            )
+        return "\n\n".join(parts)
+    except Exception as e:
+        return f"Error capturing screen: {str(e)}"
+
+@mcp.tool()
+async def capture_screen_multi(qualities: List[int]) -> str:
+    """Capture the screen once and return it encoded at several JPEG qualities.
+    
+    Args:
+        qualities: JPEG qualities (1-100) to encode, e.g. [30, 60, 90]
+    
+    Returns one base64-encoded JPEG image per quality, labelled with its size.
+    """
+    return await _to_thread(_capture_screen_multi_impl, qualities)
+
+def _print_window(hwnd, width, height):
+    """Render a window into a new _Frame with PrintWindow.
+    
+    The window draws itself into a memory DC, so it is captured even when
+    covered by other windows. Returns None if the window refused to render.
+    """
+    hdc_window = win32gui.GetWindowDC(hwnd)
+    mem_dc = win32gui.CreateCompatibleDC(hdc_window)
+    bitmap, bits = _create_dib_section(mem_dc, width, height)
+    old_bitmap = win32gui.SelectObject(mem_dc, bitmap)
+    try:
+        if not _user32.PrintWindow(hwnd, mem_dc, _PW_RENDERFULLCONTENT):
+            return None
+        _gdi32.GdiFlush()
+        raw = ctypes.string_at(bits, width * height * 4)
+        return _Frame(memoryview(raw), width, height, width * 4)
+    finally:
+        win32gui.SelectObject(mem_dc, old_bitmap)
+        win32gui.DeleteObject(bitmap)
+        win32gui.DeleteDC(mem_dc)
+        win32gui.ReleaseDC(hwnd, hdc_window)
+
+def _capture_window_impl(window_title: str, quality: int) -> str:
     try:
         # Validate quality
         quality = max(1, min(100, quality))
         
         # Find window
         if window_title:
-            hwnd = win32gui.FindWindow(None, window_title)
+            hwnd = _find_window(window_title)
             if hwnd == 0:
                 return f"No window found with title '{window_title}'"
+            _, rect = _get_window_info(hwnd)
         else:
-            hwnd = win32gui.GetForegroundWindow()
-            window_title = win32gui.GetWindowText(hwnd)
+            hwnd = _get_foreground_window()
+            window_title, rect = _get_window_info(hwnd)
             if not window_title:
                 window_title = "Active Window"
         
         # Get window dimensions
-        rect = win32gui.GetWindowRect(hwnd)
         left, top, right, bottom = rect
         width = right - left
         height = bottom - top
+        if width <= 0 or height <= 0:
+            return f"Window '{window_title}' has no visible area to capture"
         
-        # Capture window using PIL
-        screenshot = ImageGrab.grab((left, top, right, bottom))
-        
-        # Convert to base64 with specified quality
+        # Let the window render itself, falling back to copying its screen
+        # region for windows that don't support PrintWindow
         buffer = io.BytesIO()
-        screenshot.save(buffer, format="JPEG", quality=quality)
-        img_str = base64.b64encode(buffer.getvalue()).decode('utf-8')
+        frame = _print_window(hwnd, width, height)
+        if frame is not None:
+            _encode_frame(frame, buffer, "jpeg", quality)
+        else:
+            with _screen_grabber.frame(rect) as frame:
+                _encode_frame(frame, buffer, "jpeg", quality)
+        img_str = _b64encode(buffer.getbuffer())
         
         # Return as Markdown image format with base64 data
         return f"![{window_title}](data:image/jpeg;base64,{img_str})"
     except Exception as e:
         return f"Error capturing window: {str(e)}"
 
-def _refresh_capture_thread(interval, quality):
-    """Background thread to capture screen periodically"""
-    global _refresh_active, _last_screenshot, _last_screenshot_time
+@mcp.tool()
+async def capture_window(window_title: str = "", quality: int = 80) -> str:
+    """Capture a specific window or the active window and return as base64 encoded image.
     
-    _refresh_active = True
-    while _refresh_active:
-        try:
-            # Capture screen
-            screenshot = ImageGrab.grab()
+    Args:
+        window_title: Title of window to capture (leave empty for active window)
+        quality: Image quality (1-100), lower values mean smaller file size but lower quality
+    
+    Returns a base64-encoded JPEG image of the specified window.
+    """
+    return await _to_thread(_capture_window_impl, window_title, quality)
+
+def _refresh_worker(interval, quality, shm_name, frame_size, frame_time, lock, request, ready, stop):
+    """Capture loop for auto-refresh, run in a separate process.
+    
+    Each pass only grabs the screen and checksums it; the frame is copied
+    when it changed, and JPEG encoding happens only when get_last_screenshot
+    sets request and no up-to-date encoding has been published. Encoded
+    frames are written into the shared memory block named shm_name.
+    
+    frame_size is -1 before the first capture, 0 while the published JPEG
+    is stale, and otherwise the length of the JPEG in shared memory.
+    """
+    shm = shared_memory.SharedMemory(name=shm_name)
+    raw_frame = None
+    raw_hash = None
+    try:
+        while not stop.is_set():
+            requested = request.is_set()
+            if requested:
+                request.clear()
+            try:
+                # Capture screen and keep a copy only if it changed
+                with _screen_grabber.frame() as frame:
+                    new_hash = zlib.crc32(frame.raw)
+                    if new_hash != raw_hash:
+                        raw_frame = _Frame(bytes(frame.raw), frame.width, frame.height, frame.stride)
+                        raw_hash = new_hash
+                        with lock:
+                            frame_size.value = 0  # published JPEG is stale
+                frame_time.value = time.time()
+                
+                # Encode on demand
+                if requested and frame_size.value == 0:
+                    buffer = io.BytesIO()
+                    _encode_frame(raw_frame, buffer, "jpeg", quality)
+                    jpeg = buffer.getbuffer()
+                    if len(jpeg) <= shm.size:
+                        with lock:
+                            shm.buf[:len(jpeg)] = jpeg
+                            frame_size.value = len(jpeg)
+                    del jpeg
+            except Exception:
+                pass  # Keep trying even if there's an error
             
-            # Convert to base64
-            buffer = io.BytesIO()
-            screenshot.save(buffer, format="JPEG", quality=quality)
-            _last_screenshot = buffer.getvalue()
-            _last_screenshot_time = time.time()
+            if requested:
+                ready.set()
             
-            # Sleep for interval
-            time.sleep(interval)
-        except:
-            time.sleep(interval)  # Keep trying even if there's an error
+            # Sleep for interval, waking early when a screenshot is requested
+            request.wait(interval)
+    finally:
+        ready.set()
+        shm.close()
+
+def _gil_enabled():
+    """Whether the GIL is active (always True before Python 3.13).
     
-    # Clear reference when thread ends
-    _last_screenshot = None
+    On a free-threaded build this becomes True again if an extension module
+    that doesn't support free threading was imported.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled() if is_gil_enabled is not None else True
+
+class _AutoRefresh:
+    """Owns the auto-refresh worker and the shared frame buffer.
+    
+    Running capture and JPEG encoding in a child process keeps that work
+    off the server's GIL, so it never adds latency to other tool calls.
+    When the GIL is disabled a thread already runs in parallel, so the
+    worker runs as a thread instead and skips the process startup.
+    """
+    
+    ENCODE_TIMEOUT = 10  # seconds to wait for the worker to encode a frame
+    
+    def __init__(self):
+        # Serialises start/stop against each other and against read()'s copy
+        # out of shared memory; tool calls arrive on different pool threads
+        self._state_lock = threading.Lock()
+        self.process = None
+        self.interval = 0
+        self._ctx = multiprocessing.get_context("spawn")
+        self._shm = None
+        self._frame_size = None
+        self._frame_time = None
+        self._lock = None
+        self._request = None
+        self._ready = None
+        self._stop = None
+    
+    def is_running(self):
+        return self.process is not None and self.process.is_alive()
+    
+    def start(self, interval, quality):
+        with self._state_lock:
+            self._stop_locked()
+            
+            # Room for a JPEG of the whole virtual screen, which is always
+            # smaller than the raw 32-bit frame
+            width = win32api.GetSystemMetrics(win32con.SM_CXVIRTUALSCREEN)
+            height = win32api.GetSystemMetrics(win32con.SM_CYVIRTUALSCREEN)
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, width * height * 4))
+            self._frame_size = self._ctx.Value('q', -1, lock=False)
+            self._frame_time = self._ctx.Value('d', 0.0, lock=False)
+            self._lock = self._ctx.Lock()
+            self._request = self._ctx.Event()
+            self._ready = self._ctx.Event()
+            self._stop = self._ctx.Event()
+            
+            self.interval = interval
+            worker_type = self._ctx.Process if _gil_enabled() else threading.Thread
+            self.process = worker_type(
+                target=_refresh_worker,
+                args=(interval, quality, self._shm.name, self._frame_size, self._frame_time,
+                      self._lock, self._request, self._ready, self._stop),
+                daemon=True
+            )
+            self.process.start()
+    
+    def stop(self):
+        with self._state_lock:
+            self._stop_locked()
+    
+    def _stop_locked(self):
+        if self.process is not None:
+            self._stop.set()
+            self._request.set()
+            self.process.join(1.0)
+            if self.process.is_alive() and hasattr(self.process, "terminate"):
+                self.process.terminate()
+            self.process = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+    
+    def read(self):
+        """Return (jpeg_bytes, capture_time) for the current frame.
+        
+        Blocks while the worker encodes a frame if needed. jpeg_bytes is None
+        if auto-refresh isn't running. Raises TimeoutError if it is running
+        but no frame could be produced in time.
+        """
+        with self._state_lock:
+            if not self.is_running():
+                return None, 0
+            shm, frame_size, frame_time = self._shm, self._frame_size, self._frame_time
+            lock, request, ready = self._lock, self._request, self._ready
+        if frame_size.value < 0:
+            raise TimeoutError("the first frame hasn't been captured yet")
+        
+        # Retry once in case the screen changed again right after encoding
+        for _ in range(2):
+            if frame_size.value == 0:
+                # Wait without the state lock so stop_auto_refresh isn't held up
+                ready.clear()
+                request.set()
+                ready.wait(self.ENCODE_TIMEOUT)
+            with self._state_lock:
+                if self._shm is not shm:
+                    # Stopped (or restarted) while waiting
+                    return None, 0
+                with lock:
+                    size = frame_size.value
+                    if size > 0:
+                        with shm.buf[:size] as view:
+                            return bytes(view), frame_time.value
+        raise TimeoutError("the worker didn't encode a frame in time")
+
+_auto_refresh = _AutoRefresh()
 
 @mcp.tool()
 async def start_auto_refresh(interval: int = 5, quality: int = 60) -> str:
@@ -141,29 +661,16 @@ async def start_auto_refresh(interval: int = 5, quality: int = 60) -> str:
     
     Returns confirmation that auto-refresh was started.
     """
-    global _refresh_thread, _refresh_active, _refresh_interval
-    
     # Validate parameters
     interval = max(2, min(60, interval))
     quality = max(1, min(100, quality))
     
     # Check if already running
-    if _refresh_active and _refresh_thread and _refresh_thread.is_alive():
-        return f"Auto-refresh is already running with interval {_refresh_interval} seconds."
-    
-    # Stop any existing thread
-    if _refresh_thread and _refresh_thread.is_alive():
-        _refresh_active = False
-        _refresh_thread.join(1.0)
-    
-    # Start new thread
-    _refresh_interval = interval
-    _refresh_thread = threading.Thread(
-        target=_refresh_capture_thread,
-        args=(interval, quality),
-        daemon=True
-    )
-    _refresh_thread.start()
+    if _auto_refresh.is_running():
+        return f"Auto-refresh is already running with interval {_auto_refresh.interval} seconds."
+    
+    # Start new worker (stopping any leftover one)
+    await _to_thread(_auto_refresh.start, interval, quality)
     
     return f"Auto-refresh started with {interval} second interval at {quality}% quality."
 
@@ -173,47 +680,111 @@ async def stop_auto_refresh() -> str:
     
     Returns confirmation that auto-refresh was stopped.
     """
-    global _refresh_active, _refresh_thread
-    
-    if not _refresh_active or not _refresh_thread or not _refresh_thread.is_alive():
+    if not _auto_refresh.is_running():
         return "Auto-refresh is not currently running."
     
-    # Stop the thread
-    _refresh_active = False
-    _refresh_thread.join(1.0)
+    # Stop the worker
+    await _to_thread(_auto_refresh.stop)
     
     return "Auto-refresh has been stopped."
 
+def _get_last_screenshot_impl() -> str:
+    try:
+        try:
+            screenshot, screenshot_time = _auto_refresh.read()
+        except TimeoutError as e:
+            return f"Auto-refresh is running but no screenshot is ready yet ({e}). Try again shortly."
+        if screenshot is None:
+            return "No screenshot available. Start auto-refresh first with start_auto_refresh()."
+        
+        # Calculate age of screenshot
+        age = time.time() - screenshot_time
+        
+        # Convert to base64
+        img_str = _b64encode(screenshot)
+        
+        # Return as Markdown image with age info
+        return f"Screenshot from {age:.1f} seconds ago:\n\n![Screenshot](data:image/jpeg;base64,{img_str})"
+    except Exception as e:
+        return f"Error getting last screenshot: {str(e)}"
+
 @mcp.tool()
 async def get_last_screenshot() -> str:
     """Get the most recent auto-refresh screenshot.
     
     Returns the latest screenshot taken by auto-refresh or an error if auto-refresh isn't active.
     """
-    global _last_screenshot, _last_screenshot_time
-    
-    if not _last_screenshot:
-        return "No screenshot available. Start auto-refresh first with start_auto_refresh()."
-    
-    # Calculate age of screenshot
-    age = time.time() - _last_screenshot_time
+    # Base64-encoding a multi-megabyte frame is done off the event loop too
+    return await _to_thread(_get_last_screenshot_impl)
+
+# Most recent (hwnd, timestamp, title, rect) looked up for the foreground window
+_WINDOW_INFO_TTL = 0.05  # seconds
+_window_info_cache = (0, 0.0, "", (0, 0, 0, 0))
+
+def _get_window_info(hwnd):
+    """Return (title, rect) for hwnd, reusing a lookup younger than _WINDOW_INFO_TTL.
     
-    # Convert to base64
-    img_str = base64.b64encode(_last_screenshot).decode('utf-8')
+    GetWindowText and GetWindowRect go through the window's owning thread,
+    so rapid polling clients would otherwise pay that round trip every time.
+    """
+    global _window_info_cache
+    cached_hwnd, timestamp, title, rect = _window_info_cache
+    now = time.monotonic()
+    if hwnd == cached_hwnd and now - timestamp < _WINDOW_INFO_TTL:
+        return title, rect
     
-    # Return as Markdown image with age info
-    return f"Screenshot from {age:.1f} seconds ago:\n\n![Screenshot](data:image/jpeg;base64,{img_str})"
+    title = win32gui.GetWindowText(hwnd)
+    rect = win32gui.GetWindowRect(hwnd)
+    _window_info_cache = (hwnd, now, title, rect)
+    return title, rect
 
-@mcp.tool()
-async def get_active_window_info() -> str:
-    """Get information about the currently active window.
+# Foreground window handle, kept for about one display frame
+_FOREGROUND_TTL = 0.016  # seconds
+_foreground_cache = (0, 0.0)
+
+def _get_foreground_window():
+    """Return the foreground window handle, reusing a very recent lookup"""
+    global _foreground_cache
+    hwnd, timestamp = _foreground_cache
+    now = time.monotonic()
+    if now - timestamp < _FOREGROUND_TTL and hwnd and win32gui.IsWindow(hwnd):
+        return hwnd
+    hwnd = win32gui.GetForegroundWindow()
+    _foreground_cache = (hwnd, now)
+    return hwnd
+
+# FindWindow results keyed by title, as (hwnd, timestamp)
+_FIND_WINDOW_TTL = 0.05  # seconds
+_FIND_WINDOW_CACHE_MAX = 64
+_find_window_cache: Dict[str, tuple] = {}
+_find_window_cache_lock = threading.Lock()
+
+def _find_window(title):
+    """FindWindow by title, reusing a lookup younger than _FIND_WINDOW_TTL.
     
-    Returns details about the foreground window, including title and position.
+    A cached handle is only reused while it still refers to a window.
+    Returns 0 if no window has that title.
     """
+    now = time.monotonic()
+    with _find_window_cache_lock:
+        entry = _find_window_cache.get(title)
+    if entry is not None and now - entry[1] < _FIND_WINDOW_TTL and win32gui.IsWindow(entry[0]):
+        return entry[0]
+    
+    hwnd = win32gui.FindWindow(None, title)
+    if hwnd:
+        with _find_window_cache_lock:
+            if len(_find_window_cache) >= _FIND_WINDOW_CACHE_MAX:
+                # Drop expired lookups so arbitrary titles can't grow the cache
+                for stale in [t for t, (_, ts) in _find_window_cache.items() if now - ts >= _FIND_WINDOW_TTL]:
+                    del _find_window_cache[stale]
+            _find_window_cache[title] = (hwnd, now)
+    return hwnd
+
+def _get_active_window_info_impl() -> str:
     try:
-        hwnd = win32gui.GetForegroundWindow()
-        title = win32gui.GetWindowText(hwnd)
-        rect = win32gui.GetWindowRect(hwnd)
+        hwnd = _get_foreground_window()
+        title, rect = _get_window_info(hwnd)
         left, top, right, bottom = rect
         width = right - left
         height = bottom - top
@@ -228,14 +799,17 @@ async def get_active_window_info() -> str:
     except Exception as e:
         return f"Error getting active window info: {str(e)}"
 
-# ----- Windows Remote Assistance Integration ----- #
-
 @mcp.tool()
-async def start_remote_assistance() -> str:
-    """Launch Windows Remote Assistance in offer help mode.
+async def get_active_window_info() -> str:
+    """Get information about the currently active window.
     
-    This opens the built-in Windows Remote Assistance tool to establish a connection.
+    Returns details about the foreground window, including title and position.
     """
+    return await _to_thread(_get_active_window_info_impl)
+
+# ----- Windows Remote Assistance Integration ----- #
+
+def _start_remote_assistance_impl() -> str:
     try:
         # Check if msra.exe exists
         msra_path = os.path.join(os.environ.get('SystemRoot', 'C:\\Windows'), 'System32', 'msra.exe')
@@ -256,69 +830,353 @@ async def start_remote_assistance() -> str:
     except Exception as e:
         return f"Error launching Remote Assistance: {str(e)}"
 
+@mcp.tool()
+async def start_remote_assistance() -> str:
+    """Launch Windows Remote Assistance in offer help mode.
+    
+    This opens the built-in Windows Remote Assistance tool to establish a connection.
+    """
+    return await _to_thread(_start_remote_assistance_impl)
+
 # ----- Command Execution Tools ----- #
 
+# Only the first and last bytes of command output are kept in memory
+_OUTPUT_HEAD_LIMIT = 10 * 1024
+_OUTPUT_TAIL_LIMIT = 10 * 1024
+_OUTPUT_CHUNK_SIZE = 4096
+
+async def _read_head_tail(stream, head_limit=_OUTPUT_HEAD_LIMIT, tail_limit=_OUTPUT_TAIL_LIMIT):
+    """Read a stream to EOF, keeping only its first and last bytes.
+    
+    Returns the decoded output with a truncation marker in the middle if
+    anything was dropped.
+    """
+    head = bytearray()
+    tail = collections.deque()
+    tail_size = 0
+    total = 0
+    while True:
+        chunk = await stream.read(_OUTPUT_CHUNK_SIZE)
+        if not chunk:
+            break
+        total += len(chunk)
+        if len(head) < head_limit:
+            take = head_limit - len(head)
+            head += chunk[:take]
+            chunk = chunk[take:]
+            if not chunk:
+                continue
+        tail.append(chunk)
+        tail_size += len(chunk)
+        # Drop whole chunks that are no longer needed for the tail
+        while tail_size - len(tail[0]) >= tail_limit:
+            tail_size -= len(tail.popleft())
+    
+    tail_bytes = b"".join(tail)[-tail_limit:]
+    encoding = locale.getpreferredencoding(False)
+    output = head.decode(encoding, errors='replace')
+    dropped = total - len(head) - len(tail_bytes)
+    if dropped > 0:
+        output += f"\n\n... [{dropped} bytes truncated] ...\n\n"
+    return output + tail_bytes.decode(encoding, errors='replace')
+
+def _split_command(command):
+    """Split a Windows command line into an argv list, unquoting arguments."""
+    argv = []
+    for arg in shlex.split(command, posix=False):
+        if len(arg) >= 2 and arg[0] == arg[-1] == '"':
+            arg = arg[1:-1]
+        argv.append(arg)
+    return argv
+
+async def _terminate_process_group(proc):
+    """Stop a process started with CREATE_NEW_PROCESS_GROUP and its children."""
+    # Snapshot the tree first; once the parent exits its children can no
+    # longer be found through it
+    try:
+        descendants = psutil.Process(proc.pid).children(recursive=True)
+    except psutil.Error:
+        descendants = []
+    
+    try:
+        proc.send_signal(signal.CTRL_BREAK_EVENT)
+        await asyncio.wait_for(proc.wait(), timeout=2)
+    except (asyncio.TimeoutError, ProcessLookupError, OSError):
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
+    
+    # CTRL_BREAK_EVENT can't be delivered when the server has no console
+    # (e.g. started by a GUI client), and proc.kill() only ends the parent,
+    # so kill whatever is left of the tree
+    for child in descendants:
+        try:
+            child.kill()
+        except psutil.Error:
+            pass
+
+# Commands that are refused outright: wiping a drive root, formatting a
+# volume, shutting the machine down (directly or through cmd /c, start or
+# call), or piping downloaded text into a shell
+_DANGEROUS_COMMAND = re.compile(
+    r"""(?ix)
+    \brm\s+-(?:rf|fr)\s+/(?:\*|\s|$)
+    | \bformat(?:\.com)?\s+[a-z]:
+    | \b(?:del|erase|rd|rmdir)\s+(?:/[a-z](?:/[a-z])*\s+)*[a-z]:\\(?:\*(?:\.\*)?)?(?:\s|$)
+    | (?:^|[&|;(])\s*(?:(?:(?:\S*\\)?cmd(?:\.exe)?\s+/[ck]|start|call)\s+)*"?(?:\S*\\)?shutdown(?:\.exe)?(?:[\s"]|$)
+    | \|\s*(?:bash|sh|cmd|powershell|pwsh|iex)\b
+    """
+)
+
+def _check_dangerous(command_line):
+    """Return an error message if the command line matches a blocked pattern"""
+    match = _DANGEROUS_COMMAND.search(command_line)
+    if match:
+        return f"Command blocked: '{match.group(0).strip()}' matches a dangerous command pattern."
+    return None
+
+async def _run_process(argv=None, command=None, timeout=30):
+    """Run argv directly, or command through cmd.exe, and collect its output.
+    
+    Returns (exit_code, output), or None if the process timed out and was
+    stopped.
+    """
+    # Start the command in its own process group so it can be stopped as a
+    # whole; unbuffered Python children flush output as they produce it
+    kwargs = dict(
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.STDOUT,
+        creationflags=subprocess.CREATE_NEW_PROCESS_GROUP,
+        env=dict(os.environ, PYTHONUNBUFFERED="1"),
+    )
+    if argv is not None:
+        proc = await asyncio.create_subprocess_exec(*argv, **kwargs)
+    else:
+        proc = await asyncio.create_subprocess_shell(command, **kwargs)
+    
+    async def collect():
+        output = await _read_head_tail(proc.stdout)
+        await proc.wait()
+        return output
+    
+    try:
+        output = await asyncio.wait_for(collect(), timeout=timeout)
+    except asyncio.TimeoutError:
+        await _terminate_process_group(proc)
+        return None
+    return proc.returncode, output
+
 @mcp.tool()
-async def execute_command(command: str) -> str:
-    """Execute a Windows command.
+async def run_argv(argv: List[str]) -> str:
+    """Run a program directly, without going through cmd.exe.
+    
+    This is the fast path for running executables: no shell is started and
+    arguments are passed exactly as given, with no shell parsing or expansion.
     
     Args:
-        command: Command to execute (e.g., 'dir', 'ipconfig', etc.)
+        argv: Program and arguments (e.g., ['ipconfig', '/all'])
     
-    Returns the output of the command.
+    Returns the output of the program.
     """
     try:
-        # Execute the command and capture output
-        result = subprocess.run(
-            command, 
-            shell=True, 
-            capture_output=True, 
-            text=True,
-            timeout=30
-        )
+        if not argv:
+            return "No program specified."
         
-        # Format the response
-        output = result.stdout or result.stderr
-        exit_code = result.returncode
+        blocked = _check_dangerous(subprocess.list2cmdline(argv))
+        if blocked:
+            return blocked
+        
+        result = await _run_process(argv=argv)
+        if result is None:
+            return "Command timed out after 30 seconds"
+        exit_code, output = result
         
         return f"Command executed with exit code {exit_code}:\n\n```\n{output}\n```"
-    except subprocess.TimeoutExpired:
-        return "Command timed out after 30 seconds"
     except Exception as e:
         return f"Error executing command: {str(e)}"
 
 @mcp.tool()
-async def execute_powershell(script: str) -> str:
-    """Execute a PowerShell script.
+async def execute_command(command: str, shell: bool = True) -> str:
+    """Execute a Windows command.
+    
+    Prefer run_argv for plain executables; this tool is needed for shell
+    built-ins, pipes and redirection.
     
     Args:
-        script: PowerShell script to execute
+        command: Command to execute (e.g., 'dir', 'ipconfig', etc.)
+        shell: Run through cmd.exe (needed for built-ins like 'dir'); set to False
+               to launch the executable directly
     
-    Returns the output of the script.
+    Returns the output of the command.
     """
     try:
-        # Create a temporary file for the script
-        script_path = os.path.join(os.environ.get('TEMP', '.'), f"tpc_ps_script_{int(time.time())}.ps1")
-        with open(script_path, 'w', encoding='utf-8') as f:
-            f.write(script)
+        blocked = _check_dangerous(command)
+        if blocked:
+            return blocked
         
-        # Execute the script
-        result = subprocess.run(
-            ["powershell", "-ExecutionPolicy", "Bypass", "-File", script_path],
+        if shell:
+            result = await _run_process(command=command)
+        else:
+            result = await _run_process(argv=_split_command(command))
+        if result is None:
+            return "Command timed out after 30 seconds"
+        exit_code, output = result
+        
+        return f"Command executed with exit code {exit_code}:\n\n```\n{output}\n```"
+    except Exception as e:
+        return f"Error executing command: {str(e)}"
+
+# Encoded scripts must fit on a CreateProcess command line (32767 chars)
+_MAX_ENCODED_COMMAND = 30000
+
+def _run_powershell(script, timeout=None):
+    """Run a PowerShell script and return the CompletedProcess.
+    
+    The script is passed inline with -EncodedCommand, so no temporary file
+    is written; only scripts too long for a command line fall back to one.
+    """
+    # Progress records would otherwise appear on stderr as CLIXML
+    script = "$ProgressPreference = 'SilentlyContinue'\n" + script
+    base_args = ["powershell", "-NoProfile", "-NonInteractive", "-ExecutionPolicy", "Bypass"]
+    
+    encoded = base64.b64encode(script.encode('utf-16-le')).decode('ascii')
+    if len(encoded) <= _MAX_ENCODED_COMMAND:
+        return subprocess.run(
+            base_args + ["-EncodedCommand", encoded],
             capture_output=True,
             text=True,
-            timeout=60
+            timeout=timeout
         )
-        
-        # Clean up
+    
+    fd, script_path = tempfile.mkstemp(prefix="tpc_ps_script_", suffix=".ps1")
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8-sig') as f:
+            f.write(script)
+        return subprocess.run(
+            base_args + ["-File", script_path],
+            capture_output=True,
+            text=True,
+            timeout=timeout
+        )
+    finally:
         try:
             os.remove(script_path)
-        except:
+        except OSError:
+            pass
+
+# One line of PowerShell that runs a base64 (UTF-16LE) script in a child
+# scope, restores the working directory, and prints an end marker carrying
+# the exit code. The marker starts on a new line even if the script left a
+# partial line on stdout.
+_PS_SESSION_COMMAND = (
+    "$global:LASTEXITCODE = 0; $__tpc_failed = $false; Push-Location; "
+    "try { & ([ScriptBlock]::Create([Text.Encoding]::Unicode.GetString("
+    "[Convert]::FromBase64String('__SCRIPT__')))) 2>&1 | Out-String -Stream -Width 4096 } "
+    "catch { $__tpc_failed = $true; $_ | Out-String -Stream -Width 4096 } "
+    "finally { Pop-Location }; "
+    "$__tpc_code = if ($__tpc_failed) { 1 } elseif ($LASTEXITCODE) { $LASTEXITCODE } else { 0 }; "
+    "[Console]::Out.WriteLine(\"`n__MARKER__\" + $__tpc_code)"
+)
+
+class _PowerShellSession:
+    """A long-lived powershell.exe that runs scripts sent over stdin.
+    
+    Starting PowerShell costs hundreds of milliseconds per call, so one
+    process is kept warm and reused. Calls are serialised with a lock, and
+    the process is restarted after it exits or a script times out.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._proc = None
+        self._lines = None
+    
+    def _start(self):
+        self._proc = subprocess.Popen(
+            ["powershell", "-NoProfile", "-NoLogo", "-NonInteractive",
+             "-ExecutionPolicy", "Bypass", "-Command", "-"],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            encoding='utf-8',
+            errors='replace',
+            bufsize=1,
+            creationflags=subprocess.CREATE_NO_WINDOW
+        )
+        self._lines = queue.Queue()
+        threading.Thread(target=self._pump, args=(self._proc.stdout, self._lines), daemon=True).start()
+        self._send("[Console]::OutputEncoding = [Text.Encoding]::UTF8; $ProgressPreference = 'SilentlyContinue'")
+    
+    @staticmethod
+    def _pump(stream, lines):
+        """Forward output lines to the queue; None marks the end of output"""
+        for line in stream:
+            lines.put(line)
+        lines.put(None)
+    
+    def _send(self, line):
+        self._proc.stdin.write(line + "\n")
+        self._proc.stdin.flush()
+    
+    def _kill(self):
+        try:
+            self._proc.kill()
+        except OSError:
             pass
+        self._proc = None
+    
+    def run(self, script, timeout):
+        """Run script and return (exit_code, output).
         
-        # Format the response
-        output = result.stdout or result.stderr
-        exit_code = result.returncode
+        Raises subprocess.TimeoutExpired (after killing the session) if the
+        script doesn't finish within timeout seconds.
+        """
+        with self._lock:
+            marker = f"<<TPC_END_{uuid.uuid4().hex}>>"
+            encoded = base64.b64encode(script.encode('utf-16-le')).decode('ascii')
+            command = _PS_SESSION_COMMAND.replace('__SCRIPT__', encoded).replace('__MARKER__', marker)
+            
+            if self._proc is None or self._proc.poll() is not None:
+                self._start()
+            try:
+                self._send(command)
+            except OSError:
+                # The session died since the last call - start a new one
+                self._start()
+                self._send(command)
+            
+            output = []
+            deadline = time.monotonic() + timeout
+            while True:
+                try:
+                    line = self._lines.get(timeout=max(0, deadline - time.monotonic()))
+                except queue.Empty:
+                    self._kill()
+                    raise subprocess.TimeoutExpired(script, timeout)
+                if line is None:
+                    # The script ended the session itself (e.g. with 'exit')
+                    exit_code = self._proc.wait()
+                    self._proc = None
+                    return exit_code, "".join(output)
+                end = line.find(marker)
+                if end >= 0:
+                    output.append(line[:end])
+                    # Drop the newline written ahead of the marker
+                    result = "".join(output)
+                    if result.endswith("\n"):
+                        result = result[:-1]
+                    return int(line[end + len(marker):].strip()), result
+                output.append(line)
+
+_powershell = _PowerShellSession()
+
+def _execute_powershell_impl(script: str) -> str:
+    try:
+        # Execute the script in the warm PowerShell session
+        exit_code, output = _powershell.run(script, timeout=60)
         
         return f"PowerShell script executed with exit code {exit_code}:\n\n```\n{output}\n```"
     except subprocess.TimeoutExpired:
@@ -327,91 +1185,145 @@ async def execute_powershell(script: str) -> str:
         return f"Error executing PowerShell script: {str(e)}"
 
 @mcp.tool()
-async def open_application(app_name: str) -> str:
-    """Open an application.
+async def execute_powershell(script: str) -> str:
+    """Execute a PowerShell script.
+    
+    Scripts run in one long-lived PowerShell session. Local variables and the
+    working directory are reset after each script, but environment variables
+    ($env:), global variables and functions, imported modules and types added
+    with Add-Type remain visible to later scripts.
     
     Args:
-        app_name: Name of the application to open (e.g., 'notepad', 'chrome')
+        script: PowerShell script to execute
     
-    Returns confirmation that the application was opened.
+    Returns the output of the script.
     """
+    return await _to_thread(_execute_powershell_impl, script)
+
+# Common application mappings (keys are case-folded, and lookups fold the
+# requested name the same way)
+_APP_MAPPINGS: Mapping[str, str] = types.MappingProxyType({
+    "notepad": "notepad.exe",
+    "chrome": "chrome.exe",
+    "edge": "msedge.exe",
+    "firefox": "firefox.exe",
+    "explorer": "explorer.exe",
+    "calc": "calc.exe",
+    "calculator": "calc.exe",
+    "word": "winword.exe",
+    "excel": "excel.exe",
+    "powershell": "powershell.exe",
+    "cmd": "cmd.exe",
+})
+
+def _open_application_impl(app_name: str) -> str:
     try:
-        # Common application mappings
-        app_mappings = {
-            "notepad": "notepad.exe",
-            "chrome": "chrome.exe",
-            "edge": "msedge.exe",
-            "firefox": "firefox.exe",
-            "explorer": "explorer.exe",
-            "calc": "calc.exe",
-            "calculator": "calc.exe",
-            "word": "winword.exe",
-            "excel": "excel.exe",
-            "powershell": "powershell.exe",
-            "cmd": "cmd.exe"
-        }
-        
         # Check if we have a mapping, otherwise use the name directly
-        executable = app_mappings.get(app_name.lower(), app_name)
-        
-        # Run the application
-        subprocess.Popen(executable)
+        executable = _APP_MAPPINGS.get(app_name.strip().casefold())
+        if executable is not None:
+            command = [executable]
+        else:
+            # Unmapped names may carry arguments, so pass the command line through
+            executable = command = app_name
+        
+        # Run the application in its own console and process group so it
+        # doesn't share the server's console handles or Ctrl+C/Ctrl+Break
+        subprocess.Popen(
+            command,
+            creationflags=subprocess.CREATE_NEW_CONSOLE | subprocess.CREATE_NEW_PROCESS_GROUP
+        )
         
         return f"Application '{app_name}' ({executable}) has been opened."
     except Exception as e:
         return f"Error opening application '{app_name}': {str(e)}"
 
+@mcp.tool()
+async def open_application(app_name: str) -> str:
+    """Open an application.
+    
+    Args:
+        app_name: Name of the application to open (e.g., 'notepad', 'chrome')
+    
+    Returns confirmation that the application was opened.
+    """
+    return await _to_thread(_open_application_impl, app_name)
+
 # ----- Process Management Tools ----- #
 
-@mcp.tool()
-async def list_processes() -> str:
-    """List all running processes.
+# Elevation and identity of the server process; neither can change while it runs
+_IS_ADMIN = bool(ctypes.windll.shell32.IsUserAnAdmin())
+_CURRENT_USER = psutil.Process().username()
+
+_PROCESS_TABLE_HEADER = "PID\tName\tMemory (MB)\tCPU %\n" + "-" * 50
+
+# Window over which CPU usage is measured for the listed processes
+_CPU_SAMPLE_WINDOW = 0.1
+
+def _iter_process_rows():
+    """Yield (rss, pid, name, proc) tuples for running processes."""
+    # process_iter() reuses its own Process instances across calls and reads
+    # the attributes inside a single oneshot() block
+    for proc in psutil.process_iter(['name', 'memory_info']):
+        info = proc.info
+        memory_info = info['memory_info']
+        yield (memory_info.rss if memory_info else 0), proc.pid, info['name'], proc
+
+def _sample_cpu_percent(procs):
+    """Measure CPU usage of procs over one short shared window.
     
-    Returns a list of running processes with their PIDs, names, and memory usage.
+    Returns a list aligned with procs; None where the process went away.
     """
+    for proc in procs:
+        try:
+            proc.cpu_percent(interval=None)
+        except psutil.Error:
+            pass
+    time.sleep(_CPU_SAMPLE_WINDOW)
+    samples = []
+    for proc in procs:
+        try:
+            samples.append(proc.cpu_percent(interval=None))
+        except psutil.Error:
+            samples.append(None)
+    return samples
+
+def _list_processes_impl() -> str:
     try:
-        processes = []
-        for proc in psutil.process_iter(['pid', 'name', 'memory_info', 'cpu_percent']):
-            try:
-                proc_info = proc.info
-                memory_mb = proc_info['memory_info'].rss / (1024 * 1024) if proc_info['memory_info'] else 0
-                processes.append({
-                    'pid': proc_info['pid'],
-                    'name': proc_info['name'],
-                    'memory_mb': round(memory_mb, 2),
-                    'cpu_percent': proc_info['cpu_percent']
-                })
-            except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
-                pass
-        
-        # Sort by memory usage (highest first)
-        processes.sort(key=lambda x: x['memory_mb'], reverse=True)
+        # Keep only the 20 largest processes by memory as we go, then sample
+        # CPU usage for just those
+        top = heapq.nlargest(20, _iter_process_rows(), key=lambda row: row[0])
+        cpu_samples = _sample_cpu_percent([row[3] for row in top])
         
         # Format as text table (top 20 by memory)
-        result = "PID\tName\tMemory (MB)\tCPU %\n"
-        result += "-" * 50 + "\n"
-        
-        for proc in processes[:20]:
-            result += f"{proc['pid']}\t{proc['name']}\t{proc['memory_mb']}\t{proc['cpu_percent']}\n"
+        lines = [_PROCESS_TABLE_HEADER]
+        for (rss, pid, name, _), cpu_percent in zip(top, cpu_samples):
+            memory_mb = round(rss / (1024 * 1024), 2)
+            lines.append("\t".join((str(pid), str(name), str(memory_mb), str(cpu_percent))))
+        result = "\n".join(lines)
         
         return f"Top 20 processes by memory usage:\n\n```\n{result}\n```"
     except Exception as e:
         return f"Error listing processes: {str(e)}"
 
 @mcp.tool()
-async def kill_process(pid: int) -> str:
-    """Kill a process by its PID.
-    
-    Args:
-        pid: Process ID to kill
+async def list_processes() -> str:
+    """List all running processes.
     
-    Returns confirmation that the process was killed.
+    Returns a list of running processes with their PIDs, names, and memory usage.
     """
+    return await _to_thread(_list_processes_impl)
+
+def _kill_process_impl(pid: int) -> str:
     try:
         # Get process info before killing
         process = psutil.Process(pid)
         process_name = process.name()
         
+        # Without elevation, another user's process can't be killed, so
+        # don't attempt it
+        if not _IS_ADMIN and process.username() != _CURRENT_USER:
+            raise psutil.AccessDenied(pid)
+        
         # Kill the process
         process.kill()
         
@@ -423,98 +1335,222 @@ async def kill_process(pid: int) -> str:
     except Exception as e:
         return f"Error killing process: {str(e)}"
 
-# ----- System Information Tools ----- #
-
 @mcp.tool()
-async def get_system_info() -> str:
-    """Get detailed system information.
+async def kill_process(pid: int) -> str:
+    """Kill a process by its PID.
     
-    Returns information about the system, including OS, CPU, memory, and disk usage.
+    Args:
+        pid: Process ID to kill
+    
+    Returns confirmation that the process was killed.
     """
+    return await _to_thread(_kill_process_impl, pid)
+
+# ----- System Information Tools ----- #
+
+# Seconds between background CPU usage samples
+_CPU_SAMPLE_INTERVAL = 2
+
+# Prime psutil's counters so later non-blocking calls return a real delta
+psutil.cpu_percent(interval=None)
+_cpu_primed_at = time.monotonic()
+
+# Shortest window that gives a meaningful CPU usage delta
+_CPU_MIN_WINDOW = 0.1
+_last_cpu_percent = None
+_cpu_sampler_thread = None
+_cpu_sampler_lock = threading.Lock()
+
+def _cpu_sampler():
+    """Background thread that keeps _last_cpu_percent up to date"""
+    global _last_cpu_percent
+    while True:
+        time.sleep(_CPU_SAMPLE_INTERVAL)
+        _last_cpu_percent = psutil.cpu_percent(interval=None)
+
+def _start_cpu_sampler():
+    """Start the CPU sampler thread if it isn't running yet"""
+    global _cpu_sampler_thread
+    with _cpu_sampler_lock:
+        if _cpu_sampler_thread is None:
+            _cpu_sampler_thread = threading.Thread(target=_cpu_sampler, daemon=True)
+            _cpu_sampler_thread.start()
+
+# OS and CPU facts that can't change while the server runs
+_UNAME = platform.uname()
+_SYSTEM_INFO_STATIC = "\n".join([
+    f"System: {_UNAME.system}",
+    f"Node Name: {_UNAME.node}",
+    f"Release: {_UNAME.release}",
+    f"Version: {_UNAME.version}",
+    f"Machine: {_UNAME.machine}",
+    f"Running as Administrator: {'Yes' if _IS_ADMIN else 'No'}",
+    "",
+    f"CPU Count (Logical): {psutil.cpu_count(logical=True)}",
+    f"CPU Count (Physical): {psutil.cpu_count(logical=False)}",
+])
+
+def _get_system_info_impl() -> str:
     try:
-        # OS information
-        uname = platform.uname()
-        system_info = f"System: {uname.system}\n"
-        system_info += f"Node Name: {uname.node}\n"
-        system_info += f"Release: {uname.release}\n"
-        system_info += f"Version: {uname.version}\n"
-        system_info += f"Machine: {uname.machine}\n\n"
-        
-        # CPU information
-        system_info += f"CPU Count (Logical): {psutil.cpu_count(logical=True)}\n"
-        system_info += f"CPU Count (Physical): {psutil.cpu_count(logical=False)}\n"
-        system_info += f"CPU Usage: {psutil.cpu_percent(interval=1)}%\n\n"
+        _start_cpu_sampler()
+        
+        # OS information and CPU counts are fixed, so only usage is read here
+        lines = [_SYSTEM_INFO_STATIC]
+        cpu_percent = _last_cpu_percent
+        if cpu_percent is None:
+            # No background sample yet - use the delta since the priming call
+            cpu_percent = psutil.cpu_percent(interval=None)
+        lines.append(f"CPU Usage: {cpu_percent}%")
+        lines.append("")
         
         # Memory information
         memory = psutil.virtual_memory()
-        system_info += f"Total Memory: {memory.total / (1024**3):.2f} GB\n"
-        system_info += f"Available Memory: {memory.available / (1024**3):.2f} GB\n"
-        system_info += f"Used Memory: {memory.used / (1024**3):.2f} GB ({memory.percent}%)\n\n"
+        lines.append(f"Total Memory: {memory.total / (1024**3):.2f} GB")
+        lines.append(f"Available Memory: {memory.available / (1024**3):.2f} GB")
+        lines.append(f"Used Memory: {memory.used / (1024**3):.2f} GB ({memory.percent}%)")
+        lines.append("")
         
         # Disk information
         disk = psutil.disk_usage('/')
-        system_info += f"Total Disk Space: {disk.total / (1024**3):.2f} GB\n"
-        system_info += f"Used Disk Space: {disk.used / (1024**3):.2f} GB ({disk.percent}%)\n"
-        system_info += f"Free Disk Space: {disk.free / (1024**3):.2f} GB\n"
+        lines.append(f"Total Disk Space: {disk.total / (1024**3):.2f} GB")
+        lines.append(f"Used Disk Space: {disk.used / (1024**3):.2f} GB ({disk.percent}%)")
+        lines.append(f"Free Disk Space: {disk.free / (1024**3):.2f} GB")
+        system_info = "\n".join(lines)
         
         return f"System Information:\n\n```\n{system_info}\n```"
     except Exception as e:
         return f"Error retrieving system information: {str(e)}"
 
-# ----- File System Tools ----- #
-
 @mcp.tool()
-async def list_directory(path: str = ".") -> str:
-    """List files and directories at the specified path.
-    
-    Args:
-        path: Directory path to list (default: current directory)
+async def get_system_info() -> str:
+    """Get detailed system information.
     
-    Returns a list of files and directories at the specified path.
+    Returns information about the system, including OS, CPU, memory, and disk usage.
     """
+    if _last_cpu_percent is None:
+        # Before the sampler's first reading the usage is the delta since
+        # the priming call, which reads as 0% if taken too soon after it
+        remaining = _cpu_primed_at + _CPU_MIN_WINDOW - time.monotonic()
+        if remaining > 0:
+            await asyncio.sleep(remaining)
+    return await _to_thread(_get_system_info_impl)
+
+# ----- File System Tools ----- #
+
+_DIRECTORY_TABLE_HEADER = "Name\tType\tSize\tModified\n" + "-" * 80
+
+def _list_directory_impl(path: str) -> str:
     try:
         # Expand user directory if needed
         full_path = os.path.expanduser(path)
         
-        # Check if path exists
-        if not os.path.exists(full_path):
+        # Check that the path exists and is a directory with a single stat
+        try:
+            st = os.stat(full_path)
+        except (FileNotFoundError, NotADirectoryError):
             return f"Path does not exist: {full_path}"
-        
-        # Check if path is a directory
-        if not os.path.isdir(full_path):
+        if not stat.S_ISDIR(st.st_mode):
             return f"Path is not a directory: {full_path}"
         
         # List contents
+        # scandir entries carry the stat data from the directory enumeration,
+        # so each entry costs at most one stat instead of four. Entries are
+        # (is_file, name, size, mtime) tuples, so plain tuple ordering sorts
+        # directories first, then by name.
         contents = []
-        for item in os.listdir(full_path):
-            item_path = os.path.join(full_path, item)
-            is_dir = os.path.isdir(item_path)
-            size = os.path.getsize(item_path) if os.path.isfile(item_path) else 0
-            modified = datetime.fromtimestamp(os.path.getmtime(item_path)).strftime('%Y-%m-%d %H:%M:%S')
-            
-            contents.append({
-                'name': item,
-                'type': 'Directory' if is_dir else 'File',
-                'size': size,
-                'modified': modified
-            })
-        
-        # Sort by type (directories first) then by name
-        contents.sort(key=lambda x: (0 if x['type'] == 'Directory' else 1, x['name']))
-        
-        # Format as text table
-        result = f"Contents of {full_path}:\n\n"
-        result += "Name\tType\tSize\tModified\n"
-        result += "-" * 80 + "\n"
-        
-        for item in contents:
-            size_str = f"{item['size'] / 1024:.2f} KB" if item['type'] == 'File' else ""
-            result += f"{item['name']}\t{item['type']}\t{size_str}\t{item['modified']}\n"
+        with os.scandir(full_path) as entries:
+            for entry in entries:
+                is_dir = entry.is_dir()
+                try:
+                    # Report a symlink's target, like os.stat would
+                    st = entry.stat()
+                except FileNotFoundError:
+                    # Broken link - fall back to the link itself
+                    st = entry.stat(follow_symlinks=False)
+                contents.append((not is_dir, entry.name, 0 if is_dir else st.st_size, int(st.st_mtime)))
+        contents.sort()
+        
+        # Format as text table. Entries sharing the same modification second
+        # (common after a copy or extract) reuse the already formatted time.
+        lines = [f"Contents of {full_path}:", "", _DIRECTORY_TABLE_HEADER]
+        formatted_mtimes = {}
+        for is_file, name, size, mtime in contents:
+            modified = formatted_mtimes.get(mtime)
+            if modified is None:
+                modified = time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(mtime))
+                formatted_mtimes[mtime] = modified
+            if is_file:
+                lines.append("\t".join((name, "File", f"{size / 1024:.2f} KB", modified)))
+            else:
+                lines.append("\t".join((name, "Directory", "", modified)))
+        result = "\n".join(lines)
         
         return f"```\n{result}\n```"
     except Exception as e:
         return f"Error listing directory: {str(e)}"
 
+@mcp.tool()
+async def list_directory(path: str = ".") -> str:
+    """List files and directories at the specified path.
+    
+    Args:
+        path: Directory path to list (default: current directory)
+    
+    Returns a list of files and directories at the specified path.
+    """
+    return await _to_thread(_list_directory_impl, path)
+
+_READ_FILE_LIMIT = 1024 * 1024  # 1 MB
+
+# Decoded file contents keyed on (path, mtime_ns, size), so an entry is
+# never served once the file changes; bounded by total bytes, not entries
+_READ_CACHE_BUDGET = 32 * 1024 * 1024  # 32 MB
+_read_cache = collections.OrderedDict()  # key -> (content, size in bytes)
+_read_cache_size = 0
+
+def _read_cache_get(key):
+    """Return cached file contents for key, or None on a miss"""
+    entry = _read_cache.get(key)
+    if entry is None:
+        return None
+    _read_cache.move_to_end(key)
+    return entry[0]
+
+def _read_cache_put(key, content, size):
+    """Cache file contents, evicting least recently used entries over budget"""
+    global _read_cache_size
+    if size > _READ_CACHE_BUDGET:
+        return
+    
+    # Drop stale versions of the same file first
+    for stale in [k for k in _read_cache if k[0] == key[0]]:
+        _read_cache_size -= _read_cache.pop(stale)[1]
+    
+    _read_cache[key] = (content, size)
+    _read_cache_size += size
+    while _read_cache_size > _READ_CACHE_BUDGET:
+        _, (_, evicted_size) = _read_cache.popitem(last=False)
+        _read_cache_size -= evicted_size
+
+def _normalize_newlines(text):
+    """Translate CRLF and lone CR line endings to LF, as a text-mode open() would"""
+    return text.replace('\r\n', '\n').replace('\r', '\n')
+
+# Files at least this large are memory-mapped and decoded in place rather
+# than read into an intermediate buffer
+_MMAP_READ_THRESHOLD = 64 * 1024
+
+def _read_mapped(full_path):
+    """Decode a file through a memory map.
+    
+    Returns (size, content); content is None if the file exceeds the limit.
+    """
+    with open(full_path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if len(mm) > _READ_FILE_LIMIT:
+                return len(mm), None
+            return len(mm), _normalize_newlines(str(mm, 'utf-8', 'replace'))
+
 @mcp.tool()
 async def read_file(path: str) -> str:
     """Read the contents of a text file.
@@ -528,17 +1564,37 @@ async def read_file(path: str) -> str:
         # Expand user directory if needed
         full_path = os.path.expanduser(path)
         
-        # Check if file exists
-        if not os.path.exists(full_path):
+        # Check if file exists; this stat is reused for every check below.
+        # It runs off the event loop since it can stall on network paths.
+        try:
+            st = await aiofiles.os.stat(full_path)
+        except (FileNotFoundError, NotADirectoryError):
             return f"File does not exist: {full_path}"
+        if stat.S_ISDIR(st.st_mode):
+            return f"Path is a directory, not a file: {full_path}"
         
         # Check if file is too large
-        if os.path.getsize(full_path) > 1024 * 1024:  # 1 MB limit
-            return f"File is too large to read directly: {full_path} ({os.path.getsize(full_path) / (1024*1024):.2f} MB)"
-        
-        # Attempt to read the file
-        with open(full_path, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
+        if st.st_size > _READ_FILE_LIMIT:
+            return f"File is too large to read directly: {full_path} ({st.st_size / (1024*1024):.2f} MB)"
+        
+        # Serve unchanged files from the cache
+        cache_key = (full_path, st.st_mtime_ns, st.st_size)
+        content = _read_cache_get(cache_key)
+        if content is None:
+            if st.st_size >= _MMAP_READ_THRESHOLD:
+                size, content = await _to_thread(_read_mapped, full_path)
+            else:
+                # Read without blocking the event loop; one byte past the
+                # limit catches files that grew after the size check
+                async with aiofiles.open(full_path, 'rb') as f:
+                    data = await f.read(_READ_FILE_LIMIT + 1)
+                size = len(data)
+                if size <= _READ_FILE_LIMIT:
+                    content = _normalize_newlines(data.decode('utf-8', errors='replace'))
+            if content is None:
+                return f"File is too large to read directly: {full_path} (more than {_READ_FILE_LIMIT / (1024*1024):.2f} MB)"
+            if size == st.st_size:
+                _read_cache_put(cache_key, content, size)
         
         # Get file extension for syntax highlighting
         _, ext = os.path.splitext(full_path)
@@ -550,42 +1606,124 @@ async def read_file(path: str) -> str:
 
 # ----- Windows Control Tools ----- #
 
-@mcp.tool()
-async def send_keystrokes(keys: str) -> str:
-    """Send keystrokes to the active window.
-    
-    Args:
-        keys: Keystrokes to send (e.g., 'Hello, world!')
+_INPUT_KEYBOARD = 1
+_KEYEVENTF_UNICODE = 0x0004
+
+class _KEYBDINPUT(ctypes.Structure):
+    _fields_ = [
+        ("wVk", wintypes.WORD),
+        ("wScan", wintypes.WORD),
+        ("dwFlags", wintypes.DWORD),
+        ("time", wintypes.DWORD),
+        ("dwExtraInfo", wintypes.WPARAM),
+    ]
+
+class _MOUSEINPUT(ctypes.Structure):
+    _fields_ = [
+        ("dx", wintypes.LONG),
+        ("dy", wintypes.LONG),
+        ("mouseData", wintypes.DWORD),
+        ("dwFlags", wintypes.DWORD),
+        ("time", wintypes.DWORD),
+        ("dwExtraInfo", wintypes.WPARAM),
+    ]
+
+class _INPUTUNION(ctypes.Union):
+    # MOUSEINPUT is the largest member and determines sizeof(INPUT)
+    _fields_ = [("ki", _KEYBDINPUT), ("mi", _MOUSEINPUT)]
+
+class _INPUT(ctypes.Structure):
+    _anonymous_ = ("u",)
+    _fields_ = [("type", wintypes.DWORD), ("u", _INPUTUNION)]
+
+_user32.SendInput.argtypes = [wintypes.UINT, ctypes.POINTER(_INPUT), ctypes.c_int]
+_user32.SendInput.restype = wintypes.UINT
+
+# Characters that applications expect as virtual keys rather than text
+_TEXT_VIRTUAL_KEYS = {
+    "\n": win32con.VK_RETURN,
+    "\t": win32con.VK_TAB,
+}
+
+def _build_key_events(text):
+    """Build KEYDOWN/KEYUP INPUT pairs for text.
     
-    Returns confirmation that the keystrokes were sent.
+    Text is sent as UTF-16 code units with KEYEVENTF_UNICODE, so any
+    character is typed regardless of keyboard layout.
     """
+    events = []
+    for c in text.replace("\r\n", "\n"):
+        vk = _TEXT_VIRTUAL_KEYS.get(c)
+        if vk is not None:
+            events.append((vk, 0, 0))
+            events.append((vk, 0, win32con.KEYEVENTF_KEYUP))
+            continue
+        encoded = c.encode('utf-16-le')
+        for i in range(0, len(encoded), 2):
+            unit = int.from_bytes(encoded[i:i + 2], 'little')
+            events.append((0, unit, _KEYEVENTF_UNICODE))
+            events.append((0, unit, _KEYEVENTF_UNICODE | win32con.KEYEVENTF_KEYUP))
+    
+    inputs = (_INPUT * len(events))()
+    for item, (vk, scan, flags) in zip(inputs, events):
+        item.type = _INPUT_KEYBOARD
+        item.ki.wVk = vk
+        item.ki.wScan = scan
+        item.ki.dwFlags = flags
+    return inputs
+
+def _send_inputs(inputs):
+    """Inject inputs with one SendInput call; returns an error message or None"""
+    if not inputs:
+        return None
+    sent = _user32.SendInput(len(inputs), inputs, ctypes.sizeof(_INPUT))
+    if sent != len(inputs):
+        return f"Error sending keystrokes: only {sent} of {len(inputs)} key events were accepted."
+    return None
+
+def _send_keystrokes_impl(keys: str, key_delay_ms: int = 0) -> str:
     try:
-        # This is a simplified version - in a real implementation, 
-        # you would use a library like pyautogui or win32com
         hwnd = win32gui.GetForegroundWindow()
         if hwnd == 0:
             return "No window is currently active."
         
-        # Use the Windows API to send keystrokes
-        for c in keys:
-            win32api.keybd_event(ord(c), 0, 0, 0)
-            win32api.keybd_event(ord(c), 0, win32con.KEYEVENTF_KEYUP, 0)
-            time.sleep(0.01)
+        # Validate delay
+        key_delay_ms = max(0, min(1000, key_delay_ms))
+        
+        if key_delay_ms > 0:
+            # Some applications drop keys injected faster than they poll
+            # input, so type one character at a time
+            delay = key_delay_ms / 1000
+            for i, c in enumerate(keys.replace("\r\n", "\n")):
+                if i:
+                    time.sleep(delay)
+                error = _send_inputs(_build_key_events(c))
+                if error:
+                    return error
+        else:
+            # Inject every key event with a single SendInput call
+            error = _send_inputs(_build_key_events(keys))
+            if error:
+                return error
         
         return f"Sent keystrokes: '{keys}' to the active window."
     except Exception as e:
         return f"Error sending keystrokes: {str(e)}"
 
 @mcp.tool()
-async def click_at_position(x: int, y: int) -> str:
-    """Perform a mouse click at the specified screen coordinates.
+async def send_keystrokes(keys: str, key_delay_ms: int = 0) -> str:
+    """Send keystrokes to the active window.
     
     Args:
-        x: X coordinate
-        y: Y coordinate
+        keys: Keystrokes to send (e.g., 'Hello, world!')
+        key_delay_ms: Pause between characters in milliseconds (0-1000), for
+            applications that miss fast input (default: 0, send all keys at once)
     
-    Returns confirmation that the click was performed.
+    Returns confirmation that the keystrokes were sent.
     """
+    return await _to_thread(_send_keystrokes_impl, keys, key_delay_ms)
+
+def _click_at_position_impl(x: int, y: int) -> str:
     try:
         # Move mouse to position
         win32api.SetCursorPos((x, y))
@@ -599,15 +1737,18 @@ async def click_at_position(x: int, y: int) -> str:
         return f"Error clicking at position: {str(e)}"
 
 @mcp.tool()
-async def move_mouse(x: int, y: int) -> str:
-    """Move the mouse cursor to the specified screen coordinates without clicking.
+async def click_at_position(x: int, y: int) -> str:
+    """Perform a mouse click at the specified screen coordinates.
     
     Args:
         x: X coordinate
         y: Y coordinate
     
-    Returns confirmation that the mouse was moved.
+    Returns confirmation that the click was performed.
     """
+    return await _to_thread(_click_at_position_impl, x, y)
+
+def _move_mouse_impl(x: int, y: int) -> str:
     try:
         # Move mouse to position
         win32api.SetCursorPos((x, y))
@@ -617,15 +1758,18 @@ async def move_mouse(x: int, y: int) -> str:
         return f"Error moving mouse: {str(e)}"
 
 @mcp.tool()
-async def right_click_at_position(x: int, y: int) -> str:
-    """Perform a right mouse click at the specified screen coordinates.
+async def move_mouse(x: int, y: int) -> str:
+    """Move the mouse cursor to the specified screen coordinates without clicking.
     
     Args:
         x: X coordinate
         y: Y coordinate
     
-    Returns confirmation that the right click was performed.
+    Returns confirmation that the mouse was moved.
     """
+    return await _to_thread(_move_mouse_impl, x, y)
+
+def _right_click_at_position_impl(x: int, y: int) -> str:
     try:
         # Move mouse to position
         win32api.SetCursorPos((x, y))
@@ -639,15 +1783,18 @@ async def right_click_at_position(x: int, y: int) -> str:
         return f"Error right-clicking at position: {str(e)}"
 
 @mcp.tool()
-async def double_click_at_position(x: int, y: int) -> str:
-    """Perform a double-click at the specified screen coordinates.
+async def right_click_at_position(x: int, y: int) -> str:
+    """Perform a right mouse click at the specified screen coordinates.
     
     Args:
         x: X coordinate
         y: Y coordinate
     
-    Returns confirmation that the double-click was performed.
+    Returns confirmation that the right click was performed.
     """
+    return await _to_thread(_right_click_at_position_impl, x, y)
+
+def _double_click_at_position_impl(x: int, y: int) -> str:
     try:
         # Move mouse to position
         win32api.SetCursorPos((x, y))
@@ -668,17 +1815,18 @@ async def double_click_at_position(x: int, y: int) -> str:
         return f"Error double-clicking at position: {str(e)}"
 
 @mcp.tool()
-async def drag_mouse(start_x: int, start_y: int, end_x: int, end_y: int) -> str:
-    """Perform a mouse drag operation from start coordinates to end coordinates.
+async def double_click_at_position(x: int, y: int) -> str:
+    """Perform a double-click at the specified screen coordinates.
     
     Args:
-        start_x: Starting X coordinate
-        start_y: Starting Y coordinate
-        end_x: Ending X coordinate
-        end_y: Ending Y coordinate
+        x: X coordinate
+        y: Y coordinate
     
-    Returns confirmation that the drag operation was performed.
+    Returns confirmation that the double-click was performed.
     """
+    return await _to_thread(_double_click_at_position_impl, x, y)
+
+def _drag_mouse_impl(start_x: int, start_y: int, end_x: int, end_y: int) -> str:
     try:
         # Move mouse to start position
         win32api.SetCursorPos((start_x, start_y))
@@ -699,14 +1847,23 @@ async def drag_mouse(start_x: int, start_y: int, end_x: int, end_y: int) -> str:
     except Exception as e:
         return f"Error performing drag operation: {str(e)}"
 
-# ----- Advanced Screen Recording ----- #
-
 @mcp.tool()
-async def start_screen_recording_ps() -> str:
-    """Start a screen recording using PowerShell.
+async def drag_mouse(start_x: int, start_y: int, end_x: int, end_y: int) -> str:
+    """Perform a mouse drag operation from start coordinates to end coordinates.
     
-    This uses built-in Windows APIs via PowerShell to record the screen.
+    Args:
+        start_x: Starting X coordinate
+        start_y: Starting Y coordinate
+        end_x: Ending X coordinate
+        end_y: Ending Y coordinate
+    
+    Returns confirmation that the drag operation was performed.
     """
+    return await _to_thread(_drag_mouse_impl, start_x, start_y, end_x, end_y)
+
+# ----- Advanced Screen Recording ----- #
+
+def _start_screen_recording_ps_impl() -> str:
     try:
         # Create PowerShell script
         ps_script = """
@@ -726,23 +1883,8 @@ async def start_screen_recording_ps() -> str:
         Write-Output "Screen recording started. Output will be saved to: $outputFile"
         """
         
-        # Create temporary file for PowerShell script
-        script_path = os.path.join(os.environ.get('TEMP', '.'), f"tpc_screen_record_{int(time.time())}.ps1")
-        with open(script_path, 'w', encoding='utf-8') as f:
-            f.write(ps_script)
-        
         # Execute the script
-        result = subprocess.run(
-            ["powershell", "-ExecutionPolicy", "Bypass", "-File", script_path],
-            capture_output=True,
-            text=True
-        )
-        
-        # Clean up script file
-        try:
-            os.remove(script_path)
-        except:
-            pass
+        result = _run_powershell(ps_script)
         
         # Check for errors
         if result.returncode != 0:
@@ -752,11 +1894,24 @@ async def start_screen_recording_ps() -> str:
     except Exception as e:
         return f"Error starting screen recording: {str(e)}"
 
+@mcp.tool()
+async def start_screen_recording_ps() -> str:
+    """Start a screen recording using PowerShell.
+    
+    This uses built-in Windows APIs via PowerShell to record the screen.
+    """
+    return await _to_thread(_start_screen_recording_ps_impl)
+
 # ----- Main Function ----- #
 
 def main():
     """Main function to run the MCP server"""
     print("Starting Total PC Commander MCP Server...", file=sys.stderr)
+    if not _gil_enabled():
+        print("Running free-threaded (GIL disabled)", file=sys.stderr)
+    elif sysconfig.get_config_var("Py_GIL_DISABLED"):
+        print("Free-threaded build, but the GIL was re-enabled by an extension module", file=sys.stderr)
+    _start_cpu_sampler()
     mcp.run(transport='stdio')
 
 if __name__ == "__main__":